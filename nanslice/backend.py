@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""backend.py
+
+Selects the library used to interpolate images when slicing and sampling. The default is
+scipy. For large volumes cupy or jax can be used instead, in which case each volume is copied
+to the device once and re-used for every subsequent slice.
+"""
+import weakref
+import numpy as np
+import scipy.ndimage as ndimage
+
+MAP_COORDINATES = ndimage.map_coordinates
+_BACKEND = 'scipy'
+_to_device = np.asarray
+_to_host = np.asarray
+_device_cache = {}
+
+
+def set_backend(name):
+    """
+    Sets the interpolation backend
+
+    Parameters:
+
+    - name -- One of 'scipy' (default), 'cupy' or 'jax'
+
+    The jax backend only supports interpolation orders 0 and 1.
+    """
+    global MAP_COORDINATES, _BACKEND, _to_device, _to_host
+    if name == 'scipy':
+        MAP_COORDINATES = ndimage.map_coordinates
+        _to_device = np.asarray
+        _to_host = np.asarray
+    elif name == 'cupy':
+        import cupy
+        import cupyx.scipy.ndimage as cupy_ndimage
+        MAP_COORDINATES = cupy_ndimage.map_coordinates
+        _to_device = cupy.asarray
+        _to_host = cupy.asnumpy
+    elif name == 'jax':
+        import jax
+        import jax.numpy as jnp
+        import jax.scipy.ndimage as jax_ndimage
+
+        def _jax_map(data, coords, order=1):
+            return jax_ndimage.map_coordinates(data, list(coords), order=order)
+        MAP_COORDINATES = jax.jit(_jax_map, static_argnames='order')
+        _to_device = jnp.asarray
+        _to_host = np.asarray
+    else:
+        raise ValueError('Unknown backend: ' + str(name))
+    _BACKEND = name
+    _device_cache.clear()
+
+
+def get_backend():
+    """Returns the name of the current interpolation backend"""
+    return _BACKEND
+
+
+def device_array(data):
+    """
+    Returns a copy of data for the current backend. Copies are cached for as long as the
+    original array is alive, so each volume is only transferred once.
+
+    Parameters:
+
+    - data -- A numpy array
+    """
+    if _BACKEND == 'scipy':
+        return data
+    key = id(data)
+    cached = _device_cache.get(key)
+    if cached is None or cached[0]() is not data:
+        ref = weakref.ref(data, lambda _, key=key: _device_cache.pop(key, None))
+        cached = (ref, _to_device(data))
+        _device_cache[key] = cached
+    return cached[1]
+
+
+def map_coordinates(data, coords, order=1):
+    """
+    Interpolates data at the given voxel co-ordinates using the current backend. The result
+    is always returned as a numpy array.
+
+    Parameters:
+
+    - data   -- The numpy array to interpolate
+    - coords -- Voxel co-ordinates, with the first dimension matching the dimensions of data
+    - order  -- Interpolation order. 1 is linear interpolation
+    """
+    if _BACKEND == 'scipy':
+        return MAP_COORDINATES(data, coords, order=order)
+    if _BACKEND == 'jax' and order > 1:
+        raise ValueError('The jax backend only supports interpolation orders 0 and 1, not ' +
+                         str(order))
+    return _to_host(MAP_COORDINATES(device_array(data), _to_device(coords), order=order))
@@ -4,6 +4,7 @@
 Contains a simple bounding-box class"""
 
 import numpy as np
+from .util import image_data
 
 
 class Box:
@@ -62,7 +63,7 @@ class Box:
         - img -- The volume to create the bounding-box from
         - padding -- Number of extra voxels to pad the resulting box by
         """
-        data = img.get_data()
+        data = image_data(img)
 
         # Individual axis min/maxes
         xmin, xmax = np.where(np.any(data, axis=(1, 2)))[0][[0, -1]]
@@ -6,12 +6,47 @@ Functions to create a colorbar and a dual-axis color/alphabar.
 Matplotlib has no concept of an "alphabar". In addition, because the standard
 matplotlib colormaps and colorbars only work on scalar (single-channel) input
 images, and matplotlib does not deal with alpha/transparency correctly, nanslice
-images are true-color RGB arrays. Hence we need to roll our own colorbar as well
+images are true-color RGB arrays. Hence we need to roll our own alphabar. Plain
+colorbars are drawn by matplotlib from the same lookup table that
+:py:func:`~nanslice.slice_func.colorize` uses, on a linear data axis.
 """
+from functools import lru_cache
 import numpy as np
+import matplotlib as mpl
+import matplotlib.artist
+import matplotlib.colors
+import matplotlib.colorbar
 from . import slice_func
 
 
+def _make_swatch(cm_name, clims, steps, orient):
+    """Creates a steps x steps colorized ramp, varying along the color axis of the bar"""
+    if orient == 'h':
+        cdata = np.broadcast_to(np.linspace(clims[0], clims[1], steps)[
+                                np.newaxis, :], (steps, steps))
+    else:
+        cdata = np.broadcast_to(np.linspace(clims[0], clims[1], steps)[
+                                :, np.newaxis], (steps, steps))
+    color = slice_func.colorize(cdata, cm_name, clims)
+    color.setflags(write=False)
+    return color
+
+
+_cached_swatch = lru_cache(maxsize=32)(_make_swatch)
+
+
+def _colorbar_swatch(cm_name, clims, steps, orient):
+    """
+    Returns the colorized ramp for a color/alphabar. Colormaps specified by name are cached,
+    so redrawing a bar with the same settings does not re-run the colormap. The returned array
+    is read-only.
+    """
+    clims = (float(clims[0]), float(clims[1]))
+    if isinstance(cm_name, str):
+        return _cached_swatch(cm_name, clims, steps, orient)
+    return _make_swatch(cm_name, clims, steps, orient)
+
+
 def colorbar(axes, cm_name, clims, clabel,
              black_backg=True, show_ticks=True, tick_fmt='{:.4g}', orient='h'):
     """
@@ -28,51 +63,27 @@ def colorbar(axes, cm_name, clims, clabel,
     - tick_fmt -- Valid format string for the tick labels
     - orient -- 'v' or 'h' for whether you want a vertical or horizontal colorbar
     """
-    steps = 32
-    if orient == 'h':
-        ext = (clims[0], clims[1], 0, 1)
-        cdata = np.tile(np.linspace(clims[0], clims[1], steps)[
-                        np.newaxis, :], [steps, 1])
-    else:
-        ext = (0, 1, clims[0], clims[1])
-        cdata = np.tile(np.linspace(clims[0], clims[1], steps)[
-                        :, np.newaxis], [1, steps])
-    color = slice_func.colorize(cdata, cm_name, clims)
-    axes.imshow(color, origin='lower', interpolation='hanning',
-                extent=ext, aspect='auto')
+    cmap = slice_func.linear_cmap(cm_name, clims)
+    norm = mpl.colors.Normalize(vmin=clims[0], vmax=clims[1])
+    cbar = mpl.colorbar.ColorbarBase(axes, cmap=cmap, norm=norm,
+                                     orientation='horizontal' if orient == 'h' else 'vertical')
+    cbar.outline.set_visible(False)
     if black_backg:
         forecolor = 'w'
     else:
         forecolor = 'k'
     if show_ticks:
-        ticks = (clims[0], np.sum(clims)/2, clims[1])
-        labels = (tick_fmt.format(clims[0]),
-                  clabel, tick_fmt.format(clims[1]))
-        if orient == 'h':
-            axes.set_xticks(ticks)
-            axes.set_xticklabels(labels, color=forecolor)
-            axes.set_yticks(())
-        else:
-            axes.set_yticks(ticks)
-            axes.set_yticklabels(labels, color=forecolor,
-                                 rotation='vertical', va='center')
-            axes.yaxis.tick_right()
-            axes.set_xticks(())
+        cbar.set_ticks((clims[0], np.sum(clims)/2, clims[1]))
+        cbar.set_ticklabels((tick_fmt.format(clims[0]),
+                             clabel, tick_fmt.format(clims[1])))
+        if orient != 'h':
+            mpl.artist.setp(axes.get_yticklabels(),
+                            rotation='vertical', va='center')
     else:
-        if orient == 'h':
-            axes.set_xticks((np.sum(clims)/2,))
-            axes.set_xticklabels((clabel,), color=forecolor)
-            axes.set_yticks(())
-        else:
-            axes.set_yticks((np.sum(clims)/2,))
-            axes.set_yticklabels((clabel,), color=forecolor)
-            axes.yaxis.tick_right()
-            axes.set_xticks(())
-    axes.tick_params(axis='both', which='both', length=0)
-    axes.spines['top'].set_visible(False)
-    axes.spines['bottom'].set_visible(False)
-    axes.spines['left'].set_visible(False)
-    axes.spines['right'].set_visible(False)
+        cbar.set_ticks((np.sum(clims)/2,))
+        cbar.set_ticklabels((clabel,))
+    axes.tick_params(axis='both', which='both',
+                     length=0, labelcolor=forecolor)
     axes.yaxis.label.set_color(forecolor)
     axes.xaxis.label.set_color(forecolor)
     axes.axis('on')
@@ -104,15 +115,13 @@ def alphabar(axes, cm_name, clims, clabel,
     steps = 32
     if orient == 'h':
         ext = (clims[0], clims[1], alims[0], alims[1])
-        cdata = np.tile(np.linspace(clims[0], clims[1], steps)[
-                        np.newaxis, :], [steps, 1])
-        alpha = np.tile(np.linspace(0, 1, steps)[:, np.newaxis], [1, steps])
+        alpha = np.broadcast_to(np.linspace(0, 1, steps)[
+                                :, np.newaxis], (steps, steps))
     else:
         ext = (alims[0], alims[1], clims[0], clims[1])
-        cdata = np.tile(np.linspace(clims[0], clims[1], steps)[
-                        :, np.newaxis], [1, steps])
-        alpha = np.tile(np.linspace(0, 1, steps)[np.newaxis, :], [steps, 1])
-    color = slice_func.colorize(cdata, cm_name, clims)
+        alpha = np.broadcast_to(np.linspace(0, 1, steps)[
+                                np.newaxis, :], (steps, steps))
+    color = _colorbar_swatch(cm_name, clims, steps, orient)
 
     if black_backg:
         backg = np.zeros((steps, steps, 3))
@@ -147,22 +156,11 @@ def alphabar(axes, cm_name, clims, clabel,
                 axes.axvline(x=pos, linewidth=1.5,
                              linestyle=style, color=color)
 
-    if black_backg:
-        axes.spines['bottom'].set_color('w')
-        axes.spines['top'].set_color('w')
-        axes.spines['right'].set_color('w')
-        axes.spines['left'].set_color('w')
-        axes.tick_params(axis='x', colors='w')
-        axes.tick_params(axis='y', colors='w')
-        axes.yaxis.label.set_color('w')
-        axes.xaxis.label.set_color('w')
-    else:
-        axes.spines['bottom'].set_color('k')
-        axes.spines['top'].set_color('k')
-        axes.spines['right'].set_color('k')
-        axes.spines['left'].set_color('k')
-        axes.tick_params(axis='x', colors='k')
-        axes.tick_params(axis='y', colors='k')
-        axes.yaxis.label.set_color('k')
-        axes.xaxis.label.set_color('k')
+    forecolor = 'w' if black_backg else 'k'
+    for spine in axes.spines.values():
+        spine.set_color(forecolor)
+    axes.tick_params(axis='both', colors=forecolor)
+    axes.yaxis.label.set_color(forecolor)
+    axes.xaxis.label.set_color(forecolor)
+    if not black_backg:
         axes.axis('on')
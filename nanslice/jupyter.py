@@ -8,6 +8,7 @@ from . import util
 from .slicer import Slicer
 from .layer import Layer, H5Layer, blend_layers
 from .colorbar import colorbar, alphabar
+from .slice_func import levels_in_range
 
 
 def three_plane(images, orient='clin', samples=128,
@@ -81,16 +82,17 @@ def three_plane(images, orient='clin', samples=128,
     iax = [None, None, None]
 
     values = ipy.Output()
-    crosshairs = [None, None, None]
+    crosshairs = util.Crosshairs(fig, 'r')
 
     def wrap_sections(pos_x, pos_y, pos_z, vol):
         pos = (pos_x, pos_y, pos_z)
         for l in layers:
             l.volume = vol
+        crosshairs.clear()
         for i in range(3):
             slcr = Slicer(bbox, pos[util.Axis_map[directions[i]]], directions[i],
                           samples=samples, orient=orient)
-            blended_slice = blend_layers(layers, slcr)
+            blended_slice = blend_layers(layers, slcr, bytes=True)
             if implots[i]:
                 print(f'implots {i}')
                 implots[i].set_data(blended_slice)
@@ -101,15 +103,14 @@ def three_plane(images, orient='clin', samples=128,
                 iax[i].axis('off')
             if contour:
                 sl_contour = layers[cbar].get_alpha(slcr)
-                iax[i].contour(sl_contour, levels=contour, origin='lower', extent=slcr.extent,
-                               colors='k', linestyles='-', linewidths=1)
+                levels = levels_in_range(sl_contour, contour)
+                if len(levels):
+                    iax[i].contour(sl_contour, levels=levels, origin='lower', extent=slcr.extent,
+                                   colors='k', linestyles='-', linewidths=1)
             if interactive:
-                if crosshairs[i]:
-                    crosshairs[i][0].remove()
-                    crosshairs[i][1].remove()
-                crosshairs[i] = util.crosshairs(
-                    iax[i], pos, directions[i], orient, 'r')
+                crosshairs.add(iax[i], pos, directions[i], orient)
         if interactive:
+            crosshairs.flush()
             vals = [
                 f'{l.label}:\t{l.get_value([pos_x, pos_y, pos_z]):.3}' for l in layers]
             values.clear_output()
@@ -225,15 +226,17 @@ def slices(images, nrows=1, ncols=1, slice_axes=None, slice_pos=None, absolute=F
                 pos = bbox.start[util.Axis_map[axis]] + \
                     bbox.diag[util.Axis_map[axis]]*slice_pos[i]
             slcr = Slicer(bbox, pos, axis, samples=samples, orient=orient)
-            blended_slice = blend_layers(layers, slcr)
+            blended_slice = blend_layers(layers, slcr, bytes=True)
             iax = fig.add_subplot(gs1[row, col], facecolor='black')
             iax.imshow(blended_slice, origin='lower',
                        extent=slcr.extent, interpolation='bilinear')
             iax.axis('off')
             if contour:
                 sl_contour = layers[cbar].get_alpha(slcr)
-                iax.contour(sl_contour, levels=contour, origin='lower', extent=slcr.extent,
-                            colors='k', linestyles='-', linewidths=1)
+                levels = levels_in_range(sl_contour, contour)
+                if len(levels):
+                    iax.contour(sl_contour, levels=levels, origin='lower', extent=slcr.extent,
+                                colors='k', linestyles='-', linewidths=1)
     if title:
         fig.suptitle(title, color='white')
     plt.close()
@@ -275,15 +278,14 @@ def compare(image1, image2, axis='z', orient='clin', samples=128, component=None
                    mask=mask, component=component)
     layer2 = Layer(image2, interp_order=0, clim=layer1.clim,
                    mask=mask, component=component)
-    diff_data = 100 * (layer2.image.get_data() - layer1.image.get_data()
-                       ) / layer1.image.get_data()
+    diff_data = 100 * (layer2.img_data - layer1.img_data) / layer1.img_data
     diff_data[~np.isfinite(diff_data)] = 0
     if diff_clim is None:
         diff_p = np.nanpercentile(diff_data, (2, 98))
         diff_m = np.max(np.abs(diff_p))
         diff_clim = (-diff_m, diff_m)
     diff_image = nib.nifti1.Nifti1Image(
-        diff_data, affine=layer1.image.affine)
+        diff_data, affine=layer1.affine)
     diff_layer = Layer(diff_image, label='Diff %',
                        interp_order=0, mask=mask, clim=diff_clim)
     plt.ioff()
@@ -4,11 +4,12 @@
 Contains the :py:class:`~nanslice.layer.Layer` class and the :py:func:`~nanslice.layer.blend_layers`
 function.
 """
-import scipy.ndimage.interpolation as ndinterp
 import h5py
-from numpy import zeros, isfinite, nanpercentile, ma, ones_like, array, iscomplexobj, abs, angle, mat, dot, eye
+from numpy import (zeros, empty, greater, isfinite, nanpercentile, ma, ones_like, array, asarray,
+                   iscomplexobj, abs, angle, eye)
+from scipy.linalg import lu_factor, lu_solve
 from nibabel import load
-from . import slice_func
+from . import slice_func, backend
 from .box import Box
 from .util import ensure_image, check_path
 
@@ -68,6 +69,8 @@ class Layer:
         self.interp_order = interp_order
         self.volume = volume
         self.label = label
+        self._lu = None
+        self._mask_buffer = None
 
         image = ensure_image(image)
         self.affine = image.affine
@@ -136,16 +139,16 @@ class Layer:
 
         - pos -- The position to sample the image value at
         """
-        pos = mat(pos).T
-        scale = mat(self.affine[0:3, 0:3]).I
-        offset = dot(-scale, self.affine[0:3, 3]).T
-        vox = dot(scale, pos) + offset
+        if self._lu is None:
+            self._lu = lu_factor(self.affine[0:3, 0:3])
+        pos = asarray(pos, dtype=float).reshape(3, 1)
+        vox = lu_solve(self._lu, pos - self.affine[0:3, 3:4])
         if len(self.shape) == 4:
             new_vox = zeros((4, 1))
             new_vox[0:3, :] = vox
             new_vox[3, 0] = self.volume
             vox = new_vox
-        return float(ndinterp.map_coordinates(self.img_data, vox, order=1)[0])
+        return float(backend.map_coordinates(self.img_data, vox, order=1)[0])
 
     def get_slice(self, slicer):
         """
@@ -159,26 +162,39 @@ class Layer:
                              self.interp_order, self.scale, self.volume)
         return vals
 
-    def get_color(self, slicer):
+    def get_color(self, slicer, bytes=False):
         """
         Returns a colorized slice through the base image contained in the Layer
 
         Parameters:
 
         - slicer -- The :py:class:`~nanslice.slicer.Slicer` object to slice this layer with
+        - bytes  -- Return uint8 colors (0-255) instead of floats (0-1)
         """
-        return slice_func.colorize(self.get_slice(slicer), self.cmap, self.clim)
+        return slice_func.colorize(self.get_slice(slicer), self.cmap, self.clim, bytes)
+
+    def _threshold(self, slc):
+        """Thresholds a slice into a boolean buffer that is re-used between calls"""
+        if self._mask_buffer is None or self._mask_buffer.shape != slc.shape:
+            self._mask_buffer = empty(slc.shape, dtype=bool)
+        return greater(slc, self.mask_threshold, out=self._mask_buffer)
 
     def get_mask(self, slicer):
+        """
+        Returns the mask slice for this Layer, or None if there is no mask. The returned array
+        is a scratch buffer owned by the Layer and is overwritten by the next call
+
+        Parameters:
+
+        - slicer -- The :py:class:`~nanslice.slicer.Slicer` object to slice this layer with
+        """
         if self.mask_image:
-            mask_slc = slicer.sample(self.mask_image.get_fdata(
-            ), self.mask_image.affine, 0) > self.mask_threshold
+            return self._threshold(slicer.sample(self.mask_image.get_fdata(),
+                                                 self.mask_image.affine, 0))
         elif self.mask_threshold:
-            mask_slc = slicer.sample(
-                self.img_data, self.affine, self.interp_order, self.scale, self.volume) > self.mask_threshold
+            return self._threshold(self.get_slice(slicer))
         else:
             return None
-        return mask_slc
 
     def get_alpha(self, slicer):
         """
@@ -214,7 +230,7 @@ class Layer:
         return cax
 
 
-def blend_layers(layers, slicer):
+def blend_layers(layers, slicer, bytes=False):
     """
     Blends together a set of overlays using their alpha information
 
@@ -222,17 +238,21 @@ def blend_layers(layers, slicer):
 
     - layers -- An iterable (e.g. list/tuple) of :py:class:`Layer` objects
     - slicer -- The :py:class:`~nanslice.slicer.Slicer` object to slice the layers with    
+    - bytes  -- Return a uint8 (0-255) image. This is faster, and sufficient for display
     """
-    slc = slice_func.mask(layers[0].get_color(
-        slicer), layers[0].get_mask(slicer))
+    slc = layers[0].get_color(slicer, bytes)
+    slc_mask = layers[0].get_mask(slicer)
     for next_layer in layers[1:]:
-        next_slc = next_layer.get_color(slicer)
+        next_slc = next_layer.get_color(slicer, bytes)
         if next_layer.alpha_image:
             next_alpha = next_layer.get_alpha(slicer)
-            slc = slice_func.blend(slc, next_slc, next_alpha)
+            # The base mask is applied inside the blend, which saves a pass over the image
+            slc = slice_func.blend(slc, next_slc, next_alpha, slc_mask)
         else:
-            slc = slice_func.mask(next_slc, next_layer.get_mask(slicer), slc)
-    return slc
+            slc = slice_func.mask(next_slc, next_layer.get_mask(slicer),
+                                  slice_func.mask(slc, slc_mask))
+        slc_mask = None
+    return slice_func.mask(slc, slc_mask)
 
 
 class H5Layer(Layer):
@@ -270,6 +290,8 @@ class H5Layer(Layer):
         self.interp_order = interp_order
         self.volume = volume
         self.label = label
+        self._lu = None
+        self._mask_buffer = None
 
         self.affine = eye(4)
         h5file = h5py.File(path, 'r')
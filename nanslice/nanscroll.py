@@ -6,7 +6,6 @@ a video scrolling through one axis of an image. This is installed by PIP as ``na
 
 The majority of options are the same as :py:mod:`~nanslice.nanslicer`.
 """
-import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
@@ -14,7 +13,7 @@ from matplotlib.animation import FuncAnimation
 from .box import Box
 from .slicer import Slicer
 from .layer import Layer, blend_layers
-from .util import add_common_arguments, Axis_map
+from .util import common_parser, Axis_map
 
 
 def main(args=None):
@@ -25,21 +24,19 @@ def main(args=None):
 
     - args -- The command line-arguments
     """
-    parser = argparse.ArgumentParser(
-        description="Makes a video scrolling through an image")
-    add_common_arguments(parser)
+    parser = common_parser("Makes a video scrolling through an image")
     parser.add_argument('output', help='Output image name', type=str)
     parser.add_argument('--slices', type=int, default=-1,
                         help='Number of slices to scroll through')
     parser.add_argument('--slice_axis', type=str, default='z',
                         help='Axis to slice along (x/y/z)')
-    parser.add_argument('--slice_lims', type=float, nargs=2, default=(0.01, 0.99),
+    parser.add_argument('--slice_lims', type=float, nargs=2, default=[0.01, 0.99],
                         help='Slice between these limits along the axis, default=0.1 0.9')
     parser.add_argument(
         '--time', help='Scroll through time not space', action='store_true')
     parser.add_argument('--volume', type=int, default=0,
                         help='Use this volume from a timeseries')
-    parser.add_argument('--figsize', type=float, nargs=2, default=(6, 6),
+    parser.add_argument('--figsize', type=float, nargs=2, default=[6, 6],
                         help='Figure size (width, height) in inches')
     parser.add_argument('--dpi', type=int, default=150,
                         help='DPI for output figure')
@@ -54,9 +51,9 @@ def main(args=None):
     layers = [Layer(args.base_image, cmap=args.base_map, clim=args.base_lims, mask=args.mask,
                     interp_order=args.interp_order, volume=args.volume), ]
     if args.overlay:
-        layers.append(Layer(args.overlay, cmap=args.overlay_map, clim=args.overlay_lims,
+        layers.append(Layer(args.overlay, cmap=args.overlay_map, clim=args.overlay_lim,
                             mask=args.overlay_mask, mask_threshold=args.overlay_mask_thresh,
-                            alpha=args.alpha, alpha_lims=args.alpha_lims,
+                            alpha=args.overlay_alpha, alpha_lim=args.overlay_alpha_lim,
                             interp_order=args.interp_order))
 
     print('*** Setup')
@@ -90,7 +87,7 @@ def main(args=None):
     axes = plt.subplot(gs1[0], facecolor='black')
     slicer = Slicer(
         bbox, slice_pos[0], args.slice_axis, args.samples, orient=args.orient)
-    sl_final = blend_layers(layers, slicer)
+    sl_final = blend_layers(layers, slicer, bytes=True)
     image = axes.imshow(sl_final, origin=origin,
                         extent=slicer.extent, interpolation=args.interp)
     axes.axis('off')
@@ -100,14 +97,14 @@ def main(args=None):
         print('Slice pos ', slice_pos[frame])
         slicer = Slicer(bbox, slice_pos[frame], args.slice_axis,
                         args.samples, orient=args.orient)
-        sl_final = blend_layers(layers, slicer)
+        sl_final = blend_layers(layers, slicer, bytes=True)
         image.set_data(sl_final)
 
     def update_time(frame):
         """Draws the next frame"""
         print('Time frame ', frame)
         layers[0].volume = frame
-        sl_final = blend_layers(layers, slicer)
+        sl_final = blend_layers(layers, slicer, bytes=True)
         image.set_data(sl_final)
 
     print('*** Animate Frame')
@@ -37,20 +37,82 @@ for increased speed this can be changed to ``linear`` or ``none``. From experien
 it is the quality of the ``matplotlib`` step which is the dominant factor in figure
 quality, hence the defaults of fairly fast sampling in the slicing step but using
 Hanning sampling in the ``matplotlib`` step.
+
+Slicing can be spread over several processes with ``--procs N``. Each process loads the
+images once and the slices are drawn when they have all been computed.
 """
-import argparse
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
-from .util import add_common_arguments, Axis_map
+from .util import common_parser, Axis_map
 from .colorbar import colorbar, alphabar
 from .box import Box
 from .slicer import Slicer
-from .slice_func import scale_clip
+from .slice_func import scale_clip, levels_in_range
 from .layer import Layer, blend_layers
 
 
+def load_layers(args):
+    """
+    Loads the base and (optional) overlay layers specified on the command-line
+
+    Parameters:
+
+    - args -- The parsed command-line arguments
+    """
+    layers = [Layer(args.base_image, mask=args.mask, crop_center=args.crop_center, crop_size=args.crop_size,
+                    cmap=args.base_map, clim=args.base_lims, climp=args.base_lims_p, scale=args.base_scale,
+                    interp_order=args.interp_order, volume=args.volume), ]
+    if args.overlay:
+        layers.append(Layer(args.overlay, scale=args.overlay_scale,
+                            cmap=args.overlay_map, clim=args.overlay_lim,
+                            mask=args.overlay_mask, mask_threshold=args.overlay_mask_thresh,
+                            alpha=args.overlay_alpha, alpha_scale=args.overlay_alpha_scale, alpha_lim=args.overlay_alpha_lim,
+                            interp_order=args.interp_order))
+    return layers
+
+
+def compute_slice(layers, args, pos, axis, volume=None):
+    """
+    Samples and blends a single slice. This does not touch matplotlib, so can be run in a
+    worker process.
+
+    Parameters:
+
+    - layers -- The list of :py:class:`~nanslice.layer.Layer` objects to blend
+    - args   -- The parsed command-line arguments
+    - pos    -- Slice position along the axis
+    - axis   -- Slice axis
+    - volume -- If set, the volume of the base layer to slice
+
+    Returns a tuple of the blended slice, the contour (alpha) slice or None, and the extent
+    """
+    if volume is not None:
+        layers[0].volume = volume
+    slcr = Slicer(layers[0].bbox, pos, axis, args.samples, orient=args.orient)
+    sl_final = blend_layers(layers, slcr, bytes=True)
+    sl_contour = layers[1].get_alpha(slcr) if args.contour else None
+    return sl_final, sl_contour, slcr.extent
+
+
+_worker_layers = None
+_worker_args = None
+
+
+def _init_worker(args):
+    """Loads the layers once in each worker process"""
+    global _worker_layers, _worker_args
+    _worker_layers = load_layers(args)
+    _worker_args = args
+
+
+def _compute_slice_worker(task):
+    """Process pool entry point for :py:func:`compute_slice`"""
+    return compute_slice(_worker_layers, _worker_args, *task)
+
+
 def main(args=None):
     """
     The main function that is called from the command line.
@@ -59,9 +121,8 @@ def main(args=None):
 
     - args -- The command-line arguments. See module docstring or command-line help for a full list
     """
-    parser = argparse.ArgumentParser(
-        description='Takes aesthetically pleasing slices through MR images')
-    add_common_arguments(parser)
+    parser = common_parser(
+        'Takes aesthetically pleasing slices through MR images')
     parser.add_argument('output', help='Output image name', type=str)
     parser.add_argument('--slice_rows', type=int, default=4,
                         help='Number of rows of slices')
@@ -69,7 +130,7 @@ def main(args=None):
                         help='Number of columns of slices')
     parser.add_argument('--slice_axis', type=str, default='z',
                         help='Axis to slice along (x/y/z)')
-    parser.add_argument('--slice_lims', type=float, nargs=2, default=(0.1, 0.9),
+    parser.add_argument('--slice_lims', type=float, nargs=2, default=[0.1, 0.9],
                         help='Slice between these limits along the axis, default=0.1 0.9')
     parser.add_argument('--slices', type=float, nargs='+',
                         help='Slice at specified positions')
@@ -93,24 +154,17 @@ def main(args=None):
     parser.add_argument('--fontsize', type=int, default=8,
                         help='Font size, default 8')
     parser.add_argument('--title', type=str, default=None, help='Add a title')
+    parser.add_argument('--procs', type=int, default=1,
+                        help='Number of processes to slice with, default 1')
     args = parser.parse_args()
 
     mpl.rc('font', family=args.font, size=args.fontsize)
 
     print('*** Loading base image: ', args.base_image)
-    layers = [Layer(args.base_image, mask=args.mask, crop_center=args.crop_center, crop_size=args.crop_size,
-                    cmap=args.base_map, clim=args.base_lims, climp=args.base_lims_p, scale=args.base_scale,
-                    interp_order=args.interp_order, volume=args.volume), ]
+    layers = load_layers(args)
     if args.base_lims is None:
         print('*** Base limits:', layers[0].clim)
 
-    if args.overlay:
-        layers.append(Layer(args.overlay, scale=args.overlay_scale,
-                            cmap=args.overlay_map, clim=args.overlay_lim,
-                            mask=args.overlay_mask, mask_threshold=args.overlay_mask_thresh,
-                            alpha=args.overlay_alpha, alpha_scale=args.overlay_alpha_scale, alpha_lim=args.overlay_alpha_lim,
-                            interp_order=args.interp_order))
-
     bbox = layers[0].bbox
     args.slice_axis = Axis_map[args.slice_axis]
     if args.three_axis:
@@ -148,38 +202,39 @@ def main(args=None):
     figure = plt.figure(facecolor='black', figsize=args.figsize)
 
     print('*** Slicing')
-    for s in range(0, slice_total):
+    if args.timeseries:
+        tasks = [(slice_pos, args.slice_axis, s) for s in range(slice_total)]
+    else:
+        tasks = [(slice_pos[s], args.slice_axis[s]) for s in range(slice_total)]
+    if args.procs > 1:
+        # Each worker loads the images once, only the slices are sent back
+        with ProcessPoolExecutor(max_workers=args.procs, initializer=_init_worker,
+                                 initargs=(args,)) as pool:
+            results = list(pool.map(_compute_slice_worker, tasks))
+    else:
+        results = [compute_slice(layers, args, *task) for task in tasks]
+
+    for s, (sl_final, sl_contour, extent) in enumerate(results):
         if args.transpose:
             col, row = divmod(s, args.slice_rows)
         else:
             row, col = divmod(s, args.slice_cols)
         ax = plt.subplot(gs1[row, col], facecolor='black')
-        if args.timeseries:
-            layers[0].volume = s
-            sp = slice_pos
-            axis = args.slice_axis
-        else:
-            sp = slice_pos[s]
-            axis = args.slice_axis[s]
-
-        slcr = Slicer(bbox, sp, axis, args.samples, orient=args.orient)
-        sl_final = blend_layers(layers, slcr)
-        ax.imshow(sl_final, origin=origin, extent=slcr.extent,
+        ax.imshow(sl_final, origin=origin, extent=extent,
                   interpolation=args.interp)
         ax.axis('off')
         if args.contour:
-            sl_contour = layers[1].get_alpha(slcr)
             contour_levels = scale_clip(
                 np.array(args.contour), args.overlay_alpha_lim)
 
             # Contour levels must be within the range of overlay alpha values.
             # Ignore contour levels that are not within this range to prevent
             # spurious contour lines from being drawn.
-            valid_levels = (np.min(sl_contour) < contour_levels) & (
-                contour_levels < np.max(sl_contour))
-            if any(valid_levels):
-                ax.contour(sl_contour, levels=contour_levels[valid_levels], origin=origin, extent=slcr.extent,
-                           colors=args.contour_color, linestyles=args.contour_style, linewidths=1)
+            valid_levels = levels_in_range(sl_contour, contour_levels)
+            if len(valid_levels):
+                ax.contour(sl_contour, levels=valid_levels, origin=origin, extent=extent,
+                           colors=args.contour_color or 'k',
+                           linestyles=args.contour_style or '-', linewidths=1)
 
     if args.base_label or args.overlay_label:
         print('*** Adding colorbar')
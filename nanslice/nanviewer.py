@@ -19,30 +19,66 @@ For discussion of other options, please see the :py:mod:`~nanslice.nanslicer`
 documentation - the majority of options are the same across both programs.
 """
 import sys
-import argparse
 import numpy as np
-import scipy.ndimage.interpolation as ndinterp
+from scipy.linalg import lu_factor, lu_solve
 from matplotlib.figure import Figure
 from matplotlib.gridspec import GridSpec
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from PyQt5 import QtCore, QtWidgets
-from .util import add_common_arguments
+from .util import common_parser, image_data, axis_indices, Axis_map, Crosshairs
+from . import backend
 from .colorbar import colorbar, alphabar
-from .slicer import Slicer, axis_indices, Axis_map
+from .slicer import Slicer
 from .layer import Layer, blend_layers
+from .slice_func import levels_in_range
 
 PROG_NAME = 'NaNViewer'
 PROG_VERSION = "1.0"
 
 
+def _trilinear(data, s_points):
+    """
+    Trilinear interpolation of a 3D array at a (3, N) array of voxel co-ordinates. Points
+    outside the volume return 0, as with the default constant mode of map_coordinates.
+    """
+    shape = np.array(data.shape)[:, None]
+    inside = np.all((s_points >= 0) & (s_points <= shape - 1), axis=0)
+    lo = np.clip(np.floor(s_points).astype(int), 0, np.maximum(shape - 2, 0))
+    hi = np.minimum(lo + 1, shape - 1)
+    x, y, z = s_points - lo
+    vals = (data[lo[0], lo[1], lo[2]]*(1-x)*(1-y)*(1-z) + data[hi[0], lo[1], lo[2]]*x*(1-y)*(1-z) +
+            data[lo[0], hi[1], lo[2]]*(1-x)*y*(1-z) + data[hi[0], hi[1], lo[2]]*x*y*(1-z) +
+            data[lo[0], lo[1], hi[2]]*(1-x)*(1-y)*z + data[hi[0], lo[1], hi[2]]*x*(1-y)*z +
+            data[lo[0], hi[1], hi[2]]*(1-x)*y*z + data[hi[0], hi[1], hi[2]]*x*y*z)
+    return np.where(inside, vals, 0)
+
+
 def sample_point(img, point, order=1):
     """
-    Helper function to sample an image at a single point (instead of a whole slice)
+    Helper function to sample an image at a point or points (instead of a whole slice)
+
+    Parameters:
+
+    - img -- The nibabel image to sample
+    - point -- Either a single (3,) point or a (3, N) array of points in world-space
+    - order -- Interpolation order. 1 is linear interpolation
+
+    Returns an (N,) array of sampled values. The LU factorisation of the affine is cached on
+    the image, so repeated calls (e.g. while dragging the cursor) are a single triangular
+    solve. Linear interpolation of 3D data uses a specialised trilinear sampler, everything
+    else falls back to a single call to map_coordinates with the current
+    :py:mod:`~nanslice.backend`.
     """
-    scale = np.mat(img.get_affine()[0:3, 0:3]).I
-    offset = np.dot(-scale, img.get_affine()[0:3, 3]).T
-    s_point = np.dot(scale, point).T + offset[:]
-    return ndinterp.map_coordinates(img.get_data().squeeze(), s_point, order=order)
+    if getattr(img, '_lu', None) is None:
+        img._lu = lu_factor(img.affine[0:3, 0:3])
+    point = np.asarray(point, dtype=float).reshape(3, -1)
+    s_point = lu_solve(img._lu, point - img.affine[0:3, 3:4])
+    if getattr(img, '_sample_data', None) is None:
+        img._sample_data = image_data(img).squeeze()
+    data = img._sample_data
+    if order == 1 and data.ndim == 3 and backend.get_backend() == 'scipy':
+        return _trilinear(data, s_point)
+    return backend.map_coordinates(data, s_point, order=order)
 
 
 class NaNCanvas(FigureCanvas):
@@ -104,7 +140,7 @@ class NaNCanvas(FigureCanvas):
         self._slices = [None, None, None]
         self._images = [None, None, None]
         self._contours = [None, None, None]
-        self._crosshairs = [None, None, None]
+        self._crosshairs = Crosshairs(self.fig)
         self._first_time = True
         self.directions = ('z', 'x', 'y')
         self.update_figure()
@@ -119,17 +155,12 @@ class NaNCanvas(FigureCanvas):
         bbox = self.layers[0].bbox
         cursor = self.cursor
         directions = self.directions
-        # Do these individually now because I'm not clever enough to set them in the loop
-        if not self._first_time:
-            for crosshair in self._crosshairs:
-                # Crosshairs consist of a vline/hline pair
-                crosshair[0].remove()
-                crosshair[1].remove()
+        self._crosshairs.clear()
         for i in range(3):
             if i != hold:
                 self._slices[i] = Slicer(bbox, cursor[i], directions[i],
                                          args.samples, orient=args.orient)
-                sl_final = blend_layers(self.layers, self._slices[i])
+                sl_final = blend_layers(self.layers, self._slices[i], bytes=True)
                 # Draw image
                 if self._first_time:
                     self._images[i] = self.axes[i].imshow(sl_final, origin='lower',
@@ -143,16 +174,22 @@ class NaNCanvas(FigureCanvas):
 
                 # Draw contours. For contours remove collection manually
                 if self.args.contour:
-                    if not self._first_time:
+                    if self._contours[i] is not None:
                         for coll in self._contours[i].collections:
                             coll.remove()
+                        self._contours[i] = None
                     sl_contour = self.layers[1].get_slice(self._slices[i])
-                    self._contours[i] = self.axes[i].contour(sl_contour, levels=self.args.contour,
-                                                             colors=args.contour_color, linestyles=args.contour_style,
-                                                             linewidths=1.0, origin='lower',
-                                                             extent=self._slices[i].extent)
-            self._crosshairs[i] = crosshairs(self.axes[i], self.cursor,
-                                             directions[i], self.args.orient)
+                    levels = levels_in_range(sl_contour, self.args.contour)
+                    if len(levels):
+                        self._contours[i] = self.axes[i].contour(
+                            sl_contour, levels=levels,
+                            colors=args.contour_color or 'k',
+                            linestyles=args.contour_style or '-',
+                            linewidths=1.0, origin='lower',
+                            extent=self._slices[i].extent)
+            self._crosshairs.add(self.axes[i], self.cursor,
+                                 directions[i], self.args.orient)
+        self._crosshairs.flush()
         self._first_time = False
         #print('Update time:', (time.time() - t0)*1000, 'ms')
         self.draw()
@@ -233,8 +270,7 @@ def main(args=None):
 
     - args -- Command-line arguments. See module documentation or command-line for full list
     """
-    parser = argparse.ArgumentParser(description='Dual-coding viewer')
-    add_common_arguments(parser)
+    parser = common_parser('Dual-coding viewer')
     args = parser.parse_args()
     application = QtWidgets.QApplication(sys.argv)
     window = NaNViewWindow(args)
@@ -94,7 +94,7 @@ class Slices(BaseInterface):
 
             slcr = Slicer(bbox, slice_pos[s],
                           slice_axis[s], 256, orient=orient)
-            sl_final = blend_layers(layers, slcr)
+            sl_final = blend_layers(layers, slcr, bytes=True)
             ax.imshow(sl_final, origin=origin, extent=slcr.extent)
             ax.axis('off')
 
@@ -4,12 +4,17 @@
 Functions for manipulating 'slices'/images (or (X, Y, 3) arrays)
 """
 
+from functools import lru_cache
 import numpy as np
 import matplotlib as mpl
 import matplotlib.cm as cm
 import matplotlib.colors as colors
 import scipy.ndimage.filters as filters
 import colorcet as cc
+try:
+    import numba
+except ImportError:
+    numba = None
 
 
 class MidNorm(mpl.colors.Normalize):
@@ -31,13 +36,13 @@ class MidNorm(mpl.colors.Normalize):
             return mpl.colors.Normalize.__call__(value, clip)
 
 
-def colorize(data, cmap, clims):
+def get_cmap_norm(cmap, clims):
     """
-    Apply a colormap to grayscale data. Takes an (X, Y) array and returns an (X, Y, 3) array
+    Returns the matplotlib colormap and norm for a colormap name and limits, including the
+    nanslice specific 'twoway' and 'phase' colormaps
 
     Parameters:
 
-    - data -- The 2D scalar (X, Y) array to colorize
     - cmap -- Any valid matplotlib colormap or colormap name
     - clims -- The limits for the colormap
     """
@@ -54,8 +59,77 @@ def colorize(data, cmap, clims):
     else:
         cmap = mpl.cm.get_cmap(cmap)
         norm = colors.Normalize(vmin=clims[0], vmax=clims[1])
+    return cmap, norm
+
+
+_LUT_SIZE = 1024
+
+
+def _make_lut(cmap, clims, bytes=False):
+    """Tabulates the colormap at evenly spaced data values between the limits"""
+    cmap, norm = get_cmap_norm(cmap, clims)
     smap = mpl.cm.ScalarMappable(norm=norm, cmap=cmap)
-    return smap.to_rgba(data, alpha=1, bytes=False)[:, :, 0: 3]
+    lut = smap.to_rgba(np.linspace(clims[0], clims[1], _LUT_SIZE),
+                       alpha=1, bytes=bytes)[:, 0:3]
+    if not bytes:
+        lut = lut.astype(np.float32)
+    lut.setflags(write=False)
+    return lut
+
+
+_cached_lut = lru_cache(maxsize=32)(_make_lut)
+
+
+def _get_lut(cmap, clims, bytes=False):
+    """Returns the (cached, if the colormap is a name) lookup table for a colormap and limits"""
+    clims = (float(clims[0]), float(clims[1]))
+    if isinstance(cmap, str):
+        return _cached_lut(cmap, clims, bytes)
+    return _make_lut(cmap, clims, bytes)
+
+
+def linear_cmap(cmap, clims):
+    """
+    Returns a colormap that reproduces :py:func:`colorize` when used with a linear
+    Normalize between the limits. Non-linear norms, such as that of 'twoway', are baked
+    into the colors, so the data axis of a colorbar stays linear.
+
+    Parameters:
+
+    - cmap -- Any valid matplotlib colormap or colormap name
+    - clims -- The limits for the colormap
+    """
+    return colors.ListedColormap(_get_lut(cmap, clims))
+
+
+def colorize(data, cmap, clims, bytes=False):
+    """
+    Apply a colormap to grayscale data. Takes an (X, Y) array and returns an (X, Y, 3) array
+
+    The colormap is tabulated once for each colormap name and limits, so colorizing is a
+    single lookup into the table. Non-finite values are colored black.
+
+    Parameters:
+
+    - data -- The 2D scalar (X, Y) array to colorize
+    - cmap -- Any valid matplotlib colormap or colormap name
+    - clims -- The limits for the colormap
+    - bytes -- Return uint8 colors in the range 0-255 instead of floats in the range 0-1
+    """
+    clims = (float(clims[0]), float(clims[1]))
+    lut = _get_lut(cmap, clims, bytes)
+    if clims[1] > clims[0]:
+        idx = np.rint((data - clims[0]) * ((_LUT_SIZE - 1) / (clims[1] - clims[0])))
+        np.clip(idx, 0, _LUT_SIZE - 1, out=idx)
+    else:
+        idx = np.zeros_like(data, dtype=np.float64)
+    bad = ~np.isfinite(idx)
+    if bad.any():
+        idx[bad] = 0
+        rgb = lut[idx.astype(np.intp)]
+        rgb[bad] = 0
+        return rgb
+    return lut[idx.astype(np.intp)]
 
 
 def scale_clip(data, lims):
@@ -70,7 +144,28 @@ def scale_clip(data, lims):
     return np.clip((data - lims[0]) / (lims[1] - lims[0]), 0, 1)
 
 
-def blend(img_under, img_over, img_alpha):
+# Below this many pixels the NumPy expression is faster than paying for the kernel's JIT compile
+_BLEND_KERNEL_MIN_SIZE = 256 * 256
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _blend_kernel(img_under, img_over, img_alpha, img_mask=None):
+        """Masks and alpha-blends two (X, Y, C) images in a single pass"""
+        rows, cols, chans = img_under.shape
+        out = np.empty(img_under.shape, dtype=np.float64)
+        for i in numba.prange(rows):
+            for j in range(cols):
+                alpha = img_alpha[i, j]
+                keep = True
+                if img_mask is not None:
+                    keep = img_mask[i, j]
+                for c in range(chans):
+                    under = img_under[i, j, c] if keep else 0.0
+                    out[i, j, c] = under*(1 - alpha) + img_over[i, j, c]*alpha
+        return out
+
+
+def blend(img_under, img_over, img_alpha, img_mask=None):
     """
     Blend together two images using an alpha channel image
 
@@ -79,7 +174,25 @@ def blend(img_under, img_over, img_alpha):
     - img_under -- The base image (underneath the overlay)
     - img_over  -- The overlay image
     - img_alpha -- Transparency/alpha value to use when blending
+    - img_mask  -- Optional mask for the base image. Masked out base pixels are set to black before
+                   blending
+
+    If both images are uint8 the blend is done in integer arithmetic and returns uint8. Large
+    float images are blended in parallel if numba is available.
     """
+    if img_under.dtype == np.uint8 and img_over.dtype == np.uint8:
+        img_under = mask(img_under, img_mask)
+        # Alpha maps are often NaN outside the brain, treat that as transparent
+        alpha = np.rint(np.clip(np.nan_to_num(img_alpha * 255), 0, 255))
+        alpha = alpha.astype(np.uint16)[:, :, None]
+        blended = img_under.astype(np.uint16)*(255 - alpha) + \
+            img_over.astype(np.uint16)*alpha + 128
+        # Exact rounded division by 255
+        return ((blended + (blended >> 8)) >> 8).astype(np.uint8)
+    if (numba is not None and img_alpha.size >= _BLEND_KERNEL_MIN_SIZE and img_under.ndim == 3 and
+            img_under.shape == img_over.shape and img_alpha.shape == img_under.shape[:2]):
+        return _blend_kernel(img_under, img_over, img_alpha, img_mask)
+    img_under = mask(img_under, img_mask)
     return img_under*(1 - img_alpha[:, :, None]) + img_over*img_alpha[:, :, None]
 
 
@@ -91,10 +204,11 @@ def mask(img, img_mask, back=np.array((0, 0, 0))):
 
     - img -- The image to be masked
     - img_mask -- The mask image
-    - back -- Background value
+    - back -- Background value, converted to the type of img
     """
     if img_mask is None:
         return img
+    back = np.asarray(back).astype(img.dtype, copy=False)
     if back.ndim == 1:
         masked = np.where(img_mask[:, :, np.newaxis],
                           img, back[np.newaxis, np.newaxis, :])
@@ -109,6 +223,24 @@ def mask(img, img_mask, back=np.array((0, 0, 0))):
     return masked
 
 
+def levels_in_range(img, levels):
+    """
+    Returns the contour levels that lie strictly within the range of values in an image.
+    Levels outside this range would produce spurious (or no) contour lines. NaN pixels,
+    e.g. outside the brain, are ignored.
+
+    Parameters:
+
+    - img -- The 2D image that will be contoured
+    - levels -- The requested contour levels
+    """
+    levels = np.asarray(levels)
+    if np.isnan(img).all():
+        return levels[:0]
+    lo, hi = np.nanmin(img), np.nanmax(img)
+    return levels[(lo < levels) & (levels < hi)]
+
+
 def blur(img, sigma=1):
     """
     Blur an image with a Gaussian kernel
@@ -6,8 +6,58 @@ This module contains the core Slicer object that samples Layers to produce
 image arrays that can be drawn with matlplotlib.
 """
 import numpy as np
-import scipy.ndimage.interpolation as ndinterp
-from . import util
+from . import util, backend
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+_SAMPLE_CACHE_SIZE = 8
+
+
+def _remap_sample(img_data, physical, volume):
+    """
+    Linearly interpolates a slice with cv2.remap. This is only possible if the slice lies in a
+    voxel plane, i.e. one voxel co-ordinate is constant across the slice. The two neighbouring
+    planes are remapped and then blended. Returns None if the slice is oblique.
+
+    Parameters:
+
+    - img_data -- 3D/4D numpy array
+    - physical -- (3, X, Y) array of voxel co-ordinates
+    - volume   -- If sampling 4D data, the volume to sample
+    """
+    spread = np.ptp(physical.reshape(3, -1), axis=1)
+    planar = np.flatnonzero(spread < 1e-6)
+    if len(planar) == 0:
+        return None
+    axis = planar[0]
+    data = img_data[..., volume] if len(img_data.shape) == 4 else img_data
+    pos = physical[axis].flat[0]
+    size = data.shape[axis]
+    if pos < 0 or pos > size - 1:
+        return np.zeros(physical.shape[1:], dtype=np.float32)
+    lo = min(int(np.floor(pos)), max(size - 2, 0))
+    hi = min(lo + 1, size - 1)
+    frac = pos - lo
+    rows, cols = [d for d in range(3) if d != axis]
+    map_x = physical[cols].astype(np.float32)
+    map_y = physical[rows].astype(np.float32)
+
+    def remap_plane(index):
+        plane = np.ascontiguousarray(np.take(data, index, axis=axis), dtype=np.float32)
+        return cv2.remap(plane, map_x, map_y, cv2.INTER_LINEAR,
+                         borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+    vals = remap_plane(lo)
+    if frac > 0:
+        vals = vals*(1 - frac) + remap_plane(hi)*frac
+    # cv2 blends the border value into points within a voxel of the edge, whereas
+    # map_coordinates returns exactly 0 outside the volume
+    outside = ((physical[cols] < 0) | (physical[cols] > data.shape[cols] - 1) |
+               (physical[rows] < 0) | (physical[rows] > data.shape[rows] - 1))
+    vals[outside] = 0
+    return vals
 
 
 class Slicer:
@@ -46,34 +96,36 @@ class Slicer:
         # This is the extent parameter for matplotlib
         self.extent = (bbox.start[ind_1], bbox.end[ind_1],
                        bbox.start[ind_2], bbox.end[ind_2])
-        self._tfm = None
-        self._voxel_space = None
+        self._voxel_cache = {}
+        self._sample_cache = {}
+
+    def sample_coords(self):
+        """
+        Returns the world-space co-ordinates of this slice as a (3, N) array
+        """
+        return self._world_space.reshape(3, -1)
 
     def get_voxel_coords(self, tfm):
         """
         Returns an array of voxel space co-ordinates for this slice, which will be cached.
-        If a subsequent call uses the same affine transform, the cached co-ordinates will be returned.
-        If a new transform is passed in, then a fresh set of co-ordinates are calculated first.
+        Co-ordinates are cached for each affine transform that has been passed in, so
+        sampling several images with different transforms only calculates each set once.
 
         Parameters:
 
         - tfm -- An affine transform that defines an images physical space (usually the .affine property of an nibabel image)
         """
-        if not np.array_equal(tfm, self._tfm):
-            old_sz = self._world_space.shape
-            new_sz = np.prod(self._world_space.shape[1:])
-            scale = np.mat(tfm[0:3, 0:3]).I
-            offset = np.dot(-scale, tfm[0:3, 3]).T
-            isl = np.dot(scale, self._world_space.reshape(
-                [3, new_sz])) + offset[:]
-            isl = np.array(isl).reshape(old_sz)
-            self._voxel_space = isl
-            self._tfm = tfm
-        return self._voxel_space
+        key = np.asarray(tfm).tobytes()
+        if key not in self._voxel_cache:
+            isl = np.linalg.solve(tfm[0:3, 0:3], self.sample_coords() - tfm[0:3, 3:4])
+            self._voxel_cache[key] = isl.reshape(self._world_space.shape)
+        return self._voxel_cache[key]
 
     def sample(self, img_data, affine, order, scale=1.0, volume=0):
         """
-        Samples the passed 3D/4D image and returns a 2D slice
+        Samples the passed 3D/4D image and returns a 2D slice. The most recent samples are
+        cached, so asking for the same image, order and volume again (e.g. for a mask and a
+        color slice) does not re-interpolate.
 
         Paramters:
 
@@ -84,11 +136,24 @@ class Slicer:
         - volume   -- If sampling 4D data, specify the desired volume
 
         """
-        physical = self.get_voxel_coords(affine)
-        # Support timeseries by adding an extra co-ord specifying the volume
-        if len(img_data.shape) == 4:
-            if volume >= img_data.shape[3]:
-                volume = img_data.shape[3] - 1
-            vol_index = np.tile(volume, physical.shape[1:3])[np.newaxis, :]
-            physical = np.concatenate((physical, vol_index), axis=0)
-        return scale * ndinterp.map_coordinates(img_data, physical, order=order).T
+        if len(img_data.shape) == 4 and volume >= img_data.shape[3]:
+            volume = img_data.shape[3] - 1
+        key = (id(img_data), np.asarray(affine).tobytes(), order, volume)
+        cached = self._sample_cache.get(key)
+        # The cache holds a reference to the data so that its id cannot be reused
+        if cached is None or cached[0] is not img_data:
+            physical = self.get_voxel_coords(affine)
+            vals = None
+            if order == 1 and cv2 is not None and backend.get_backend() == 'scipy':
+                vals = _remap_sample(img_data, physical, volume)
+            if vals is None:
+                # Support timeseries by adding an extra co-ord specifying the volume
+                if len(img_data.shape) == 4:
+                    vol_index = np.tile(volume, physical.shape[1:3])[np.newaxis, :]
+                    physical = np.concatenate((physical, vol_index), axis=0)
+                vals = backend.map_coordinates(img_data, physical, order=order)
+            if len(self._sample_cache) >= _SAMPLE_CACHE_SIZE:
+                self._sample_cache.clear()
+            cached = (img_data, vals.T)
+            self._sample_cache[key] = cached
+        return scale * cached[1]
@@ -3,9 +3,15 @@
 
 Utility functions for nanslice module
 """
+import argparse
 from pathlib import Path
 import numpy as np
 import nibabel as nib
+from matplotlib.collections import LineCollection
+try:
+    import numba
+except ImportError:
+    numba = None
 
 
 def check_path(maybe_path):
@@ -24,12 +30,66 @@ def ensure_image(maybe_path):
         return maybe_path
 
 
+def image_data(img):
+    """
+    Returns the data array of an nibabel image. The array is read once and cached on the
+    image, so repeated calls do not touch the file (or decompress it) again.
+    """
+    if getattr(img, '_cached_data', None) is None:
+        img._cached_data = np.asarray(img.dataobj)
+    return img._cached_data
+
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _com_axes(data):
+        """Sums a 3D volume onto each of its axes in a single pass"""
+        n0, n1, n2 = data.shape
+        s0 = np.zeros(n0)
+        part1 = np.zeros((n0, n1))
+        part2 = np.zeros((n0, n2))
+        for i in numba.prange(n0):
+            for j in range(n1):
+                for k in range(n2):
+                    val = data[i, j, k]
+                    s0[i] += val
+                    part1[i, j] += val
+                    part2[i, k] += val
+        s1 = np.zeros(n1)
+        s2 = np.zeros(n2)
+        for i in range(n0):
+            s1 += part1[i]
+            s2 += part2[i]
+        return s0, s1, s2
+
+
+def _axis_sums(data):
+    """Returns the sums of a volume projected onto each of its first three axes"""
+    if numba is not None and data.ndim == 3:
+        return _com_axes(data)
+    plane = np.sum(data, axis=2)
+    return np.sum(plane, axis=1), np.sum(plane, axis=0), np.sum(data, axis=(0, 1))
+
+
 def center_of_mass(img):
-    """Calculates the center of mass of the image"""
-    idx0 = np.argmax(np.sum(img.get_data(), axis=(1, 2)))
-    idx1 = np.argmax(np.sum(img.get_data(), axis=(0, 2)))
-    idx2 = np.argmax(np.sum(img.get_data(), axis=(0, 1)))
-    phys = np.dot(img.affine, np.array([idx0, idx1, idx2, 1]).T)
+    """
+    Calculates the center of mass (intensity-weighted mean voxel position) of the image, and
+    returns it in world-space co-ordinates. The first moments along each axis are the moments
+    of the projections onto that axis, so the volume is only traversed once.
+
+    If the image sums to zero (e.g. it is empty) the center of the volume is returned instead.
+    Negative intensities (e.g. in a signed difference map) can put the result outside the volume.
+    """
+    data = image_data(img)
+    if data.ndim > 3:
+        data = data.reshape(data.shape[:3] + (-1,)).sum(axis=3)
+    s0, s1, s2 = _axis_sums(data)
+    total = np.sum(s0)
+    if total == 0:
+        idx = [(n - 1) / 2 for n in data.shape[:3]]
+    else:
+        idx = [np.dot(np.arange(len(proj)), proj) / total for proj in (s0, s1, s2)]
+    phys = np.dot(img.affine, np.array(idx + [1]).T)
     return phys
 
 
@@ -57,7 +117,7 @@ def add_common_arguments(parser):
                         help='Add color overlay')
     parser.add_argument('--overlay_map', type=str, default='RdYlBu_r',
                         help='Overlay colormap, default = RdYlBu_r')
-    parser.add_argument('--overlay_lim', type=float, nargs=2, default=(-1, 1),
+    parser.add_argument('--overlay_lim', type=float, nargs=2, default=[-1, 1],
                         help='Overlay window, default=-1 1')
     parser.add_argument('--overlay_mask', type=str,
                         help='Mask color image')
@@ -69,7 +129,7 @@ def add_common_arguments(parser):
                         help='Label for overlay color axis')
     parser.add_argument('--overlay_alpha', type=str,
                         help='Image for transparency-coding of overlay')
-    parser.add_argument('--overlay_alpha_lim', type=float, nargs=2, default=(0.5, 1.0),
+    parser.add_argument('--overlay_alpha_lim', type=float, nargs=2, default=[0.5, 1.0],
                         help='Overlay Alpha/transparency window, default=0.5 1.0')
     parser.add_argument('--overlay_alpha_scale', type=float, default=1.0,
                         help='Scaling factor for the alpha image')
@@ -77,10 +137,10 @@ def add_common_arguments(parser):
                         help='Label for overlay alpha/transparency axis')
     parser.add_argument('--contour', type=float, action='append',
                         help='Add alpha image contours (can be multiple)')
-    parser.add_argument('--contour_color', type=str, action='append', default='k',
-                        help='Choose contour colors')
-    parser.add_argument('--contour_style', type=str, action='append', default='-',
-                        help='Choose contor line-styles')
+    parser.add_argument('--contour_color', type=str, action='append',
+                        help='Choose contour colors, default k')
+    parser.add_argument('--contour_style', type=str, action='append',
+                        help='Choose contour line-styles, default -')
 
     parser.add_argument('--samples', type=int, default=128,
                         help='Number of samples for slicing, default=128')
@@ -93,6 +153,23 @@ def add_common_arguments(parser):
     return parser
 
 
+# Built once at import, then inherited by each tool's parser
+_COMMON_PARSER = add_common_arguments(argparse.ArgumentParser(add_help=False))
+
+
+def common_parser(description=None):
+    """
+    Returns a new ArgumentParser that already has the arguments shared between nanviewer,
+    nanslicer and nanscroll. Tool specific arguments can be added to it without changing
+    the shared definitions.
+
+    Parameters:
+
+    - description -- Description for the command-line help
+    """
+    return argparse.ArgumentParser(description=description, parents=[_COMMON_PARSER])
+
+
 Axis_map = {'x': 0, 'y': 1, 'z': 2}
 Orient_map = {'clin': ({0: 1, 1: 0, 2: 0}, {0: 2, 1: 2, 2: 1}),
               'preclin': ({0: 2, 1: 2, 2: 0}, {0: 1, 1: 0, 2: 1})}
@@ -117,3 +194,84 @@ def crosshairs(axis, point, direction, orient, color='g'):
     vline = axis.axvline(x=point[ind1], color=color)
     hline = axis.axhline(y=point[ind2], color=color)
     return (vline, hline)
+
+
+class Crosshairs:
+    """
+    Draws the crosshairs for all the axes in a figure as a single LineCollection, instead of
+    a pair of lines per axes. Add the crosshairs for each axes, then call flush() to draw them.
+    The collection is rebuilt when the figure is resized or the view limits of an axes change
+    (e.g. zoom/pan), so the lines follow the data.
+
+    Constructor parameters:
+
+    - figure -- The matplotlib figure that contains the axes
+    - color  -- Color of the crosshairs
+    """
+
+    def __init__(self, figure, color='g'):
+        self.figure = figure
+        self.color = color
+        self._lines = []
+        self._collection = None
+        self._watched = set()
+        self._flushing = False
+        figure.canvas.mpl_connect('resize_event', lambda event: self.flush())
+
+    def add(self, axis, point, direction, orient):
+        """
+        Adds crosshairs for one axes. They are not shown until flush() is called
+
+        Parameters:
+
+        - axis -- The matplotlib axes
+        - point -- The crosshair position in world-space
+        - direction -- The slice direction of the axes (x/y/z)
+        - orient -- 'clin' or 'preclin'
+        """
+        ind1, ind2 = axis_indices(Axis_map[direction], orient)
+        self._lines.append((axis, point[ind1], point[ind2]))
+        if axis not in self._watched:
+            axis.callbacks.connect('xlim_changed', lambda ax: self._refresh())
+            axis.callbacks.connect('ylim_changed', lambda ax: self._refresh())
+            self._watched.add(axis)
+
+    def clear(self):
+        """Removes all crosshairs. The figure is updated at the next flush()"""
+        self._lines = []
+
+    def _refresh(self):
+        """Re-draws the crosshairs after a view change, if they have already been drawn"""
+        if self._collection is not None and not self._flushing:
+            self.flush()
+
+    def flush(self):
+        """Replaces the drawn crosshairs with a single collection of the current crosshairs"""
+        # apply_aspect below can change the view limits, which would call back into flush
+        self._flushing = True
+        try:
+            return self._flush()
+        finally:
+            self._flushing = False
+
+    def _flush(self):
+        """Builds the collection, see flush()"""
+        if self._collection is not None:
+            self._collection.remove()
+            self._collection = None
+        to_figure = self.figure.transFigure.inverted()
+        segments = []
+        for axis, x, y in self._lines:
+            # Positions depend on the final axes box, which is adjusted for the aspect ratio
+            axis.apply_aspect()
+            x_ax, y_ax = axis.transLimits.transform((x, y))
+            (x0, y0), (x1, y1) = axis.transAxes.transform([(0, 0), (1, 1)])
+            x_disp, y_disp = axis.transData.transform((x, y))
+            if 0 <= x_ax <= 1:
+                segments.append(to_figure.transform([(x_disp, y0), (x_disp, y1)]))
+            if 0 <= y_ax <= 1:
+                segments.append(to_figure.transform([(x0, y_disp), (x1, y_disp)]))
+        self._collection = LineCollection(segments, colors=self.color,
+                                          transform=self.figure.transFigure)
+        self.figure.add_artist(self._collection)
+        return self._collection